@@ -6,6 +6,7 @@ import math
 import json
 import gzip
 from collections import Counter, defaultdict
+from functools import lru_cache
 from PyQt6.QtCore import pyqtSignal
 
 from gui.main_window import MainWindow
@@ -21,6 +22,51 @@ class AppState(Enum):
     READY = auto()          # Ready for analysis
     CLOSING = auto()        # Application shutting down
 
+@lru_cache(maxsize=4)
+def _negative_reviewers_query(with_keywords, with_genre):
+    """
+    Build the find_negative_reviewers_sql() query for one combination of
+    filters. Only four variants exist, so each is assembled once.
+    """
+    query = """
+    SELECT 
+        u.id, 
+        u.user_id, 
+        COUNT(r.id) as review_count, 
+        AVG(r.rating) as avg_rating
+    FROM user u
+    JOIN review r ON u.id = r.user_id
+    """
+    
+    # Keywords are matched through the review_fts full-text index
+    if with_keywords:
+        query += """
+    JOIN review_fts ON review_fts.rowid = r.id
+    """
+    
+    conditions = []
+    if with_genre:
+        # A semi-join keeps one row per review instead of joining through
+        # book and book_genre
+        conditions.append("""r.book_id IN (
+        SELECT bg.book_id
+        FROM book_genre bg
+        JOIN genre g ON bg.genre_id = g.id
+        WHERE g.name = ?
+    )""")
+    if with_keywords:
+        conditions.append("review_fts MATCH ?")
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    
+    # Complete the query with grouping and filtering
+    return query + """
+    GROUP BY u.id, u.user_id
+    HAVING COUNT(r.id) >= ? AND AVG(r.rating) <= ?
+    ORDER BY avg_rating ASC, review_count DESC
+    LIMIT 50
+    """
+
 class AnalyticsEngine:
     """
     Core analytics engine for the Goodreads Analytics Tool.
@@ -60,6 +106,9 @@ class AnalyticsEngine:
             if not db_path.exists() or not self.db.is_initialized():
                 self.logger.info("Database setup required")
                 self.state = AppState.SETUP_NEEDED
+            elif not self.db.upgrade_schema():
+                self.logger.error("Database schema upgrade failed")
+                self.state = AppState.SETUP_NEEDED
             else:
                 self.logger.info("Database is ready")
                 self.state = AppState.READY
@@ -116,8 +165,9 @@ class AnalyticsEngine:
             GROUP BY rating
             ORDER BY rating
             """
-            cursor = self.db.execute(query)
-            distribution = {row[0]: row[1] for row in cursor.fetchall()}
+            with self.db.read_cursor() as cursor:
+                cursor.execute(query)
+                distribution = dict(cursor.fetchall())
             return distribution
         except Exception as e:
             self.logger.error(f"Error getting rating distribution: {e}")
@@ -146,8 +196,9 @@ class AnalyticsEngine:
             GROUP BY review_range
             ORDER BY MIN(review_count)
             """
-            cursor = self.db.execute(query)
-            distribution = {row[0]: row[1] for row in cursor.fetchall()}
+            with self.db.read_cursor() as cursor:
+                cursor.execute(query)
+                distribution = dict(cursor.fetchall())
             return distribution
         except Exception as e:
             self.logger.error(f"Error getting review count distribution: {e}")
@@ -170,8 +221,9 @@ class AnalyticsEngine:
             GROUP BY rating_bin
             ORDER BY rating_bin
             """
-            cursor = self.db.execute(query)
-            distribution = {row[0]: row[1] for row in cursor.fetchall()}
+            with self.db.read_cursor() as cursor:
+                cursor.execute(query)
+                distribution = dict(cursor.fetchall())
             return distribution
         except Exception as e:
             self.logger.error(f"Error getting average rating distribution: {e}")
@@ -187,39 +239,49 @@ class AnalyticsEngine:
                 (2.5, 5), (2.5, 10), (2.5, 20)
             ]
             
-            results = {}
-            for rating, min_reviews in thresholds:
-                query = """
-                SELECT COUNT(*) as count
-                FROM (
-                    SELECT u.id
-                    FROM user u
-                    JOIN review r ON u.id = r.user_id
-                    GROUP BY u.id
-                    HAVING AVG(r.rating) <= ? AND COUNT(r.id) >= ?
-                )
-                """
-                cursor = self.db.execute(query, (rating, min_reviews))
-                count = cursor.fetchone()[0]
-                results[f"below_{rating}_min_{min_reviews}"] = count
-            
-            # Get the most negative reviewer
-            query = """
-            SELECT 
-                u.user_id, 
-                COUNT(r.id) as review_count, 
-                AVG(r.rating) as avg_rating,
-                MIN(r.rating) as min_rating,
-                MAX(r.rating) as max_rating
-            FROM user u
-            JOIN review r ON u.id = r.user_id
-            GROUP BY u.id
-            HAVING COUNT(r.id) >= 10
-            ORDER BY avg_rating ASC
-            LIMIT 1
+            # Aggregate reviews per user once and derive every threshold
+            # count and the most negative reviewer from the same CTE
+            threshold_counts = ",\n                    ".join(
+                "SUM(avg_rating <= ? AND review_count >= ?)" for _ in thresholds
+            )
+            query = f"""
+            WITH user_stats AS (
+                SELECT 
+                    user_id, 
+                    COUNT(*) as review_count, 
+                    AVG(rating) as avg_rating,
+                    MIN(rating) as min_rating,
+                    MAX(rating) as max_rating
+                FROM review
+                GROUP BY user_id
+            )
+            SELECT counts.*, worst.*
+            FROM (
+                SELECT 
+                    {threshold_counts}
+                FROM user_stats
+            ) AS counts
+            LEFT JOIN (
+                SELECT u.user_id, s.review_count, s.avg_rating, s.min_rating, s.max_rating
+                FROM user_stats s
+                JOIN user u ON u.id = s.user_id
+                WHERE s.review_count >= 10
+                ORDER BY s.avg_rating ASC
+                LIMIT 1
+            ) AS worst
             """
-            cursor = self.db.execute(query)
-            most_negative = cursor.fetchone()
+            params = [value for threshold in thresholds for value in threshold]
+            with self.db.read_cursor() as cursor:
+                cursor.execute(query, params)
+                row = cursor.fetchone()
+            
+            results = {
+                f"below_{rating}_min_{min_reviews}": count or 0
+                for (rating, min_reviews), count in zip(thresholds, row)
+            }
+            most_negative = row[len(thresholds):]
+            if most_negative[0] is None:
+                most_negative = None
             
             if most_negative:
                 self.logger.info(f"Most negative reviewer: {most_negative[0]}")
@@ -327,52 +389,13 @@ class AnalyticsEngine:
             self.logger.info(f"Searching for negative reviewers with params: " +
                             f"min_reviews={min_reviews}, max_avg_rating={max_avg_rating}")
             
-            # Build the base query
-            query = """
-            SELECT 
-                u.id, 
-                u.user_id, 
-                COUNT(r.id) as review_count, 
-                AVG(r.rating) as avg_rating
-            FROM user u
-            JOIN review r ON u.id = r.user_id
-            """
-            
-            # Add genre filtering if specified
-            if genre:
-                query += """
-                JOIN book b ON r.book_id = b.id
-                JOIN book_genre bg ON b.id = bg.book_id
-                JOIN genre g ON bg.genre_id = g.id
-                WHERE g.name = ?
-                """
-                params = [genre]
-            else:
-                params = []
-            
-            # Add keyword filtering if specified
-            if keywords and len(keywords) > 0:
-                if genre:
-                    query += " AND ("
-                else:
-                    query += " WHERE ("
-                    
-                keyword_clauses = []
-                for keyword in keywords:
-                    keyword_clauses.append("r.review_text LIKE ?")
-                    params.append(f"%{keyword}%")
-                
-                query += " OR ".join(keyword_clauses) + ")"
-            
-            # Complete the query with grouping and filtering
-            query += """
-            GROUP BY u.id, u.user_id
-            HAVING COUNT(r.id) >= ? AND AVG(r.rating) <= ?
-            ORDER BY avg_rating ASC, review_count DESC
-            LIMIT 50
-            """
-            
-            # Add the HAVING clause parameters
+            query = _negative_reviewers_query(bool(keywords), bool(genre))
+            params = [genre] if genre else []
+            if keywords:
+                # Any keyword may match; each is quoted as an FTS5 phrase
+                params.append(" OR ".join(
+                    '"' + keyword.replace('"', '""') + '"' for keyword in keywords
+                ))
             params.extend([min_reviews, max_avg_rating])
             
             # Log query details
@@ -380,25 +403,27 @@ class AnalyticsEngine:
             self.logger.info(f"With parameters: {params}")
             
             # Execute the query
-            cursor = self.db.execute(query, params)
-            results = cursor.fetchall()
+            with self.db.read_cursor() as cursor:
+                cursor.execute(query, params)
+                results = cursor.fetchall()
             
             # Log the count
             self.logger.info(f"Query returned {len(results)} results")
             
+            # Fetch the calculated fields for all users at once
+            user_ids = [row[0] for row in results]
+            stddevs = self._calculate_rating_stddevs(user_ids)
+            top_genres = self._get_top_genres_for_users(user_ids)
+            
             # Process the results
             negative_reviewers = []
             for row in results:
-                user_details = {
-                    'id': row[0],
-                    'user_id': row[1],
-                    'review_count': row[2],
-                    'avg_rating': row[3],
-                }
+                # Rows are sqlite3.Row, so the column names become the keys
+                user_details = dict(row)
                 
                 # Add additional calculated fields
-                user_details['rating_stddev'] = self._calculate_rating_stddev(row[0])
-                user_details['top_genre'] = self._get_top_genre_for_user(row[0])
+                user_details['rating_stddev'] = stddevs.get(row[0], 0.0)
+                user_details['top_genre'] = top_genres.get(row[0], "Unknown")
                 
                 negative_reviewers.append(user_details)
                 
@@ -412,8 +437,9 @@ class AnalyticsEngine:
         """Calculate standard deviation of ratings for a user."""
         try:
             query = "SELECT rating FROM review WHERE user_id = ?"
-            cursor = self.db.execute(query, (user_id,))
-            ratings = [row[0] for row in cursor.fetchall()]
+            with self.db.read_cursor() as cursor:
+                cursor.execute(query, (user_id,))
+                ratings = [row[0] for row in cursor.fetchall()]
             
             if not ratings:
                 return 0.0
@@ -426,22 +452,83 @@ class AnalyticsEngine:
             self.logger.error(f"Error calculating rating stddev: {e}")
             return 0.0
             
+    def _calculate_rating_stddevs(self, user_ids):
+        """
+        Calculate the rating standard deviation for several users with one
+        grouped query.
+        
+        Returns:
+            dict: Internal user ID -> standard deviation
+        """
+        if not user_ids:
+            return {}
+        try:
+            placeholders = ",".join("?" * len(user_ids))
+            query = f"""
+                SELECT user_id, AVG(rating * rating) - AVG(rating) * AVG(rating)
+                FROM review
+                WHERE user_id IN ({placeholders})
+                GROUP BY user_id
+            """
+            with self.db.read_cursor() as cursor:
+                cursor.execute(query, user_ids)
+                rows = cursor.fetchall()
+            return {user_id: max(variance, 0.0) ** 0.5 for user_id, variance in rows}
+        except Exception as e:
+            self.logger.error(f"Error calculating rating stddevs: {e}")
+            return {}
+            
+    def _get_top_genres_for_users(self, user_ids):
+        """
+        Get the most frequently reviewed genre for several users with one
+        windowed query.
+        
+        Returns:
+            dict: Internal user ID -> genre name
+        """
+        if not user_ids:
+            return {}
+        try:
+            placeholders = ",".join("?" * len(user_ids))
+            query = f"""
+                SELECT user_id, name
+                FROM (
+                    SELECT r.user_id, g.name,
+                        ROW_NUMBER() OVER (
+                            PARTITION BY r.user_id ORDER BY COUNT(*) DESC
+                        ) as genre_rank
+                    FROM review r
+                    JOIN book_genre bg ON r.book_id = bg.book_id
+                    JOIN genre g ON bg.genre_id = g.id
+                    WHERE r.user_id IN ({placeholders})
+                    GROUP BY r.user_id, g.name
+                )
+                WHERE genre_rank = 1
+            """
+            with self.db.read_cursor() as cursor:
+                cursor.execute(query, user_ids)
+                rows = cursor.fetchall()
+            return dict(rows)
+        except Exception as e:
+            self.logger.error(f"Error getting top genres: {e}")
+            return {}
+            
     def _get_top_genre_for_user(self, user_id):
         """Get the most frequently reviewed genre for a user."""
         try:
             query = """
                 SELECT g.name, COUNT(*) as genre_count
                 FROM review r
-                JOIN book b ON r.book_id = b.id
-                JOIN book_genre bg ON b.id = bg.book_id
+                JOIN book_genre bg ON r.book_id = bg.book_id
                 JOIN genre g ON bg.genre_id = g.id
                 WHERE r.user_id = ?
                 GROUP BY g.name
                 ORDER BY genre_count DESC
                 LIMIT 1
             """
-            cursor = self.db.execute(query, (user_id,))
-            result = cursor.fetchone()
+            with self.db.read_cursor() as cursor:
+                cursor.execute(query, (user_id,))
+                result = cursor.fetchone()
             return result[0] if result else "Unknown"
         except Exception as e:
             self.logger.error(f"Error getting top genre: {e}")
@@ -468,20 +555,18 @@ class AnalyticsEngine:
                 WHERE u.user_id = ?
                 GROUP BY u.id, u.user_id
             """
-            cursor = self.db.execute(query, (user_id,))
-            user_row = cursor.fetchone()
+            with self.db.read_cursor() as cursor:
+                cursor.execute(query, (user_id,))
+                user_row = cursor.fetchone()
             
             if not user_row:
                 return {'error': 'User not found'}
                 
-            user_details = {
-                'id': user_row[0],
-                'user_id': user_row[1],
-                'review_count': user_row[2],
-                'avg_rating': user_row[3],
-                'rating_stddev': self._calculate_rating_stddev(user_row[0]),
-                'top_genre': self._get_top_genre_for_user(user_row[0])
-            }
+            user_details = dict(
+                user_row,
+                rating_stddev=self._calculate_rating_stddev(user_row[0]),
+                top_genre=self._get_top_genre_for_user(user_row[0])
+            )
             
             # Get expanded user statistics
             stats_query = """
@@ -493,49 +578,37 @@ class AnalyticsEngine:
                     COUNT(CASE WHEN rating = 5 THEN 1 END) as rating_5_count,
                     MIN(date_added) as first_review_date,
                     MAX(date_added) as last_review_date,
-                    AVG(LENGTH(review_text)) as avg_review_length
-                FROM review
-                WHERE user_id = ?
+                    AVG(LENGTH(rb.review_text)) as avg_review_length
+                FROM review r
+                LEFT JOIN review_body rb ON rb.review_id = r.id
+                WHERE r.user_id = ?
             """
-            cursor = self.db.execute(stats_query, (user_row[0],))
-            stats_row = cursor.fetchone()
+            with self.db.read_cursor() as cursor:
+                cursor.execute(stats_query, (user_row[0],))
+                stats_row = cursor.fetchone()
             
             if stats_row:
-                user_details.update({
-                    'rating_1_count': stats_row[0],
-                    'rating_2_count': stats_row[1],
-                    'rating_3_count': stats_row[2],
-                    'rating_4_count': stats_row[3],
-                    'rating_5_count': stats_row[4],
-                    'first_review_date': stats_row[5],
-                    'last_review_date': stats_row[6],
-                    'avg_review_length': stats_row[7]
-                })
+                user_details.update(stats_row)
             
             # Get reviews with a higher limit (up to 60)
             query = """
                 SELECT 
-                    r.id, r.rating, r.review_text, r.date_added,
+                    r.id, r.rating, rb.review_text, r.date_added,
                     b.title as book_title, b.book_id as book_id
                 FROM review r
                 JOIN book b ON r.book_id = b.id
+                LEFT JOIN review_body rb ON rb.review_id = r.id
                 WHERE r.user_id = ?
                 ORDER BY r.date_added DESC
                 LIMIT 60
             """
-            cursor = self.db.execute(query, (user_row[0],))
-            recent_reviews = []
-            for row in cursor.fetchall():
-                recent_reviews.append({
-                    'id': row[0],
-                    'rating': row[1],
-                    'review_text': row[2] or "[No text]",
-                    'date_added': row[3],
-                    'book_title': row[4],
-                    'book_id': row[5]
-                })
-                
-            user_details['reviews'] = recent_reviews
+            with self.db.read_cursor() as cursor:
+                cursor.execute(query, (user_row[0],))
+                rows = cursor.fetchall()
+            user_details['reviews'] = [
+                dict(row, review_text=row['review_text'] or "[No text]")
+                for row in rows
+            ]
             
             return user_details
             
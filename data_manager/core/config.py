@@ -1,5 +1,7 @@
 # app/core/config.py
+import copy
 import json
+from functools import lru_cache
 from pathlib import Path
 import logging
 
@@ -25,6 +27,17 @@ DEFAULT_CONFIG = {
     }        
 }
 
+@lru_cache(maxsize=4)
+def _read_config(path, mtime_ns):
+    """
+    Parse the configuration file at path. The modification time is part of
+    the cache key, so an edited file is read again.
+    """
+    with open(path, 'r') as f:
+        config = json.load(f)
+    logging.getLogger(__name__).info(f"Configuration loaded from {path}")
+    return config
+
 def load_config(config_path="data_manager/config.json"):
     """
     Load application configuration from a JSON file.
@@ -41,13 +54,11 @@ def load_config(config_path="data_manager/config.json"):
     
     try:
         if path.exists():
-            with open(path, 'r') as f:
-                config = json.load(f)
-                logger.info(f"Configuration loaded from {path}")
-                return config
+            # Callers modify the returned dict, so never hand out the cached one
+            return copy.deepcopy(_read_config(path, path.stat().st_mtime_ns))
         else:
             logger.info(f"Configuration file {path} not found, creating with defaults")
-            config = DEFAULT_CONFIG.copy()
+            config = copy.deepcopy(DEFAULT_CONFIG)
             
             # Ensure the parent directory exists
             path.parent.mkdir(parents=True, exist_ok=True)
@@ -60,7 +71,7 @@ def load_config(config_path="data_manager/config.json"):
             return config
     except Exception as e:
         logger.error(f"Error handling configuration: {e}")
-        return DEFAULT_CONFIG.copy()
+        return copy.deepcopy(DEFAULT_CONFIG)
 
 def save_config(config, config_path="config.json"):
     """
@@ -91,12 +102,13 @@ def save_config(config, config_path="config.json"):
 
 def get_default_config():
     """
-    Get a copy of the default configuration.
+    Get a copy of the default configuration. The copy is deep, so changes
+    to nested sections do not leak into DEFAULT_CONFIG.
     
     Returns:
         dict: Default configuration dictionary
     """
-    return DEFAULT_CONFIG.copy()
+    return copy.deepcopy(DEFAULT_CONFIG)
 
 def update_config_value(config, key_path, value):
     """
@@ -92,7 +92,10 @@ class ReviewIndex:
             filter_conditions (str, optional): SQL WHERE clause for filtering reviews
         """
         # Build query with optional filtering
-        query = "SELECT id, review_id, book_id, user_id, rating, review_text FROM review"
+        query = (
+            "SELECT r.id, r.review_id, r.book_id, r.user_id, r.rating, rb.review_text "
+            "FROM review r JOIN review_body rb ON rb.review_id = r.id"
+        )
         if filter_conditions:
             query += f" WHERE {filter_conditions}"
         if limit:
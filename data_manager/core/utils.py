@@ -1,9 +1,13 @@
 # app/core/setup.py
 import logging
+import logging.handlers
+import os
 from pathlib import Path
 import signal
 import sys
 
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
 
 def setup_logging(config):
     """
@@ -16,12 +20,28 @@ def setup_logging(config):
     
     try:
         log_path.parent.mkdir(exist_ok=True)
+        # The file is opened lazily (delay=True), so check up front that it
+        # can be written and fall back to the console otherwise
+        if not os.access(log_path.parent, os.W_OK):
+            raise PermissionError(f"Log directory is not writable: {log_path.parent}")
+        
+        # Rotate at 10 MB, keeping three old files
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_path, maxBytes=10_000_000, backupCount=3, delay=True
+        )
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        # Batch a small number of records and write them together. Warnings
+        # and errors are written at once, so at most a few INFO records can
+        # be lost if the process is killed
+        buffered_handler = logging.handlers.MemoryHandler(
+            capacity=64, flushLevel=logging.WARNING, target=file_handler
+        )
         
         logging.basicConfig(
             level=getattr(logging, config["logging"]["level"], logging.INFO),
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+            format=LOG_FORMAT,
             handlers=[
-                logging.FileHandler(log_path),
+                buffered_handler,
                 logging.StreamHandler(sys.stdout)
             ]
         )
@@ -30,7 +50,7 @@ def setup_logging(config):
         print(f"Warning: Could not set up file logging: {e}")
         logging.basicConfig(
             level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+            format=LOG_FORMAT,
             handlers=[logging.StreamHandler(sys.stdout)]
         )
 
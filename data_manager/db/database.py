@@ -1,9 +1,67 @@
 # app/db/database.py
 import sqlite3
 import logging
+import os
+import queue
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import chain, islice
 from pathlib import Path
 import threading
 
+# INSERT ... RETURNING requires SQLite 3.35+
+SUPPORTS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Page size for new database files; larger pages hold more rows per page
+PAGE_SIZE = 8192
+
+# Tables whose secondary indexes are dropped for the duration of a bulk import
+BULK_IMPORT_TABLES = ('book', 'book_authors', 'book_genre', 'review', 'review_body')
+
+# Column lists for the generic batch insert path
+BOOK_COLUMNS = (
+    'book_id', 'title', 'isbn', 'isbn13', 'publisher', 'publication_date',
+    'language_code', 'pages', 'average_rating', 'ratings_count', 'text_reviews_count'
+)
+AUTHOR_COLUMNS = ('author_id', 'name', 'role', 'profile_url')
+
+# Rows per transaction for batch inserts fed from an iterable
+DEFAULT_CHUNK_SIZE = 10_000
+
+# Bound parameters per statement; SQLITE_MAX_VARIABLE_NUMBER before SQLite 3.32
+MAX_BIND_PARAMS = 999
+
+
+def _chunked(rows, size):
+    """Yield lists of up to size rows from any iterable, including generators."""
+    iterator = iter(rows)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+# Summary label -> table counted by get_database_stats()
+STATS_TABLES = {
+    'books': 'book',
+    'authors': 'author',
+    'users': 'user',
+    'reviews': 'review',
+}
+
+# Tables whose existence get_database_stats() checks before counting
+_STATS_PREFLIGHT_TABLES = tuple(STATS_TABLES.values()) + ('table_counts',)
+_STATS_PREFLIGHT_SQL = (
+    "SELECT name FROM sqlite_master WHERE type='table' "
+    f"AND name IN ({','.join('?' * len(_STATS_PREFLIGHT_TABLES))})"
+)
+
+
+@lru_cache(maxsize=8)
+def _table_counts_query(tables):
+    """Build one UNION ALL statement counting the rows of every table in tables."""
+    return " UNION ALL ".join(
+        f"SELECT '{table}', COUNT(*) FROM \"{table}\"" for table in tables
+    )
+
+
 class Database:
     _local = threading.local()  # Thread-local storage
     
@@ -11,6 +69,17 @@ class Database:
         self.config = config
         self.db_path = config["data"]["database"]
         self.logger = logging.getLogger(__name__)
+        # External ID -> internal row ID lookups, warmed by warm_id_caches()
+        self._book_id_cache = {}
+        self._author_id_cache = {}
+        # Read-only connections for analytics queries, opened on first use
+        self._read_pool = None
+        # Guards opening and retiring the read pool across threads
+        self._read_pool_lock = threading.Lock()
+        # (table, columns, rows) -> INSERT statement, built once by _insert_sql()
+        self._insert_sql_cache = {}
+        # table -> CREATE INDEX statements dropped by optimize_for_bulk_import()
+        self._stashed_indexes = {}
         self._connect()
 
     def _connect(self):
@@ -19,22 +88,132 @@ class Database:
             # Ensure the parent directory exists
             Path(self.db_path).parent.mkdir(exist_ok=True, parents=True)
             
-            # Connect to the database with extended options
+            # The writer only moves values in and out, so it skips the
+            # declared-type converters (detect_types=0); the read-only
+            # connections keep PARSE_DECLTYPES for analytics
             self._local.conn = sqlite3.connect(
-                self.db_path, 
-                detect_types=sqlite3.PARSE_DECLTYPES
+                self.db_path,
+                detect_types=0,
+                isolation_level=None,  # Autocommit; writes use transaction()
+                cached_statements=256
             )
-            self._local.conn.row_factory = sqlite3.Row  # Allow column name access
+            # Plain tuples on the writer; sqlite3.Row is reserved for the
+            # read-only connections used by the UI and analytics
             self._local.cursor = self._local.conn.cursor()
             
-            # Enable foreign key constraints
-            self._local.cursor.execute("PRAGMA foreign_keys = ON")
+            self._apply_storage_settings(self._local.conn)
+            self._apply_connection_pragmas(self._local.conn)
             
             self.logger.info(f"Database connection established: {self.db_path}")
         except sqlite3.Error as e:
             self.logger.error(f"Database connection error: {e}")
             raise
             
+    def _apply_storage_settings(self, conn):
+        """
+        Set the page size and journal mode on the writer connection.
+        The page size can only change before the first table is created
+        (or via VACUUM), so existing files keep their current size.
+        """
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        if page_count == 0:
+            conn.execute(f"PRAGMA page_size = {PAGE_SIZE}")
+        else:
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            if page_size != PAGE_SIZE:
+                self.logger.info(
+                    f"Keeping existing page size {page_size} "
+                    f"(a VACUUM is needed to switch to {PAGE_SIZE})"
+                )
+        # WAL must be enabled after the page size is set. This is the only
+        # place the journal mode is set: the file stays in WAL for its whole
+        # lifetime, bulk imports included, since switching modes needs
+        # exclusive access. Fetch the result so the statement is reset
+        conn.execute("PRAGMA journal_mode = WAL").fetchone()
+
+    def _apply_connection_pragmas(self, conn):
+        """
+        Apply the per-connection PRAGMAs shared by all connections.
+        These are the steady-state settings; journal_mode is persistent and
+        is set separately on the writer.
+        """
+        # Enable foreign key constraints
+        conn.execute("PRAGMA foreign_keys = ON")
+        # In WAL mode NORMAL only syncs at checkpoints and stays durable
+        # against application crashes
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA wal_autocheckpoint = 1000")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute("PRAGMA mmap_size = 1073741824")  # 1 GiB
+        conn.execute("PRAGMA cache_size = -65536")  # 64 MiB
+
+    def _open_read_pool(self):
+        """
+        Open the pool of read-only connections used by read_cursor().
+        Each connection keeps one cursor for its lifetime, so borrowing does
+        not allocate a new cursor per query.
+        """
+        uri = Path(self.db_path).resolve().as_uri() + "?mode=ro"
+        pool = queue.Queue()
+        conns = []
+        try:
+            for _ in range(os.cpu_count() or 1):
+                conn = sqlite3.connect(
+                    uri,
+                    uri=True,
+                    detect_types=sqlite3.PARSE_DECLTYPES,
+                    check_same_thread=False
+                )
+                conns.append(conn)
+                conn.row_factory = sqlite3.Row
+                self._apply_connection_pragmas(conn)
+                # Refuse writes at the statement level as well as the file level
+                conn.execute("PRAGMA query_only = 1")
+                pool.put(conn.cursor())
+        except sqlite3.Error:
+            # Never publish a partial pool; borrowers would wait forever
+            for conn in conns:
+                conn.close()
+            raise
+        self._read_pool = pool
+        self.logger.info(f"Opened {len(conns)} read-only connections")
+
+    @contextmanager
+    def read_cursor(self):
+        """
+        Borrow a cursor on a read-only connection for analytics queries.
+        The writer connection (self.conn) is left free for inserts.
+        
+        The cursor goes back to the pool it came from. If that pool was
+        retired by _close_read_pool() in the meantime, its connection is
+        closed instead.
+        """
+        while True:
+            with self._read_pool_lock:
+                if self._read_pool is None:
+                    try:
+                        self._open_read_pool()
+                    except sqlite3.Error as e:
+                        self.logger.error(f"Error opening read-only connections: {e}")
+                        raise
+                pool = self._read_pool
+            try:
+                # Wake up now and then to notice a retired pool, whose idle
+                # cursors are gone and which will never be refilled
+                cursor = pool.get(timeout=0.1)
+                break
+            except queue.Empty:
+                continue
+        try:
+            yield cursor
+        finally:
+            with self._read_pool_lock:
+                retired = pool is not self._read_pool
+                if not retired:
+                    pool.put(cursor)
+            if retired:
+                cursor.connection.close()
+
     @property
     def conn(self):
         """Get the thread-local connection."""
@@ -92,6 +271,25 @@ class Database:
             self.logger.error(f"Batch query execution error: {e}")
             raise
 
+    @contextmanager
+    def transaction(self):
+        """
+        Run the enclosed statements in one explicit transaction.
+        
+        The writer connection runs in autocommit mode, so every write path
+        opens its transaction here with BEGIN IMMEDIATE, taking the write
+        lock up front. Nested calls join the outer transaction, so the
+        batch_insert_* helpers re-raise their errors when called inside one
+        rather than returning False. The connection's own context manager
+        commits on success and rolls back on any exception.
+        """
+        if self.conn.in_transaction:
+            yield
+            return
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            yield
+
     def commit(self):
         """Commit the current transaction."""
         self.conn.commit()
@@ -100,8 +298,27 @@ class Database:
         """Roll back the current transaction."""
         self.conn.rollback()
 
+    def _close_read_pool(self):
+        """
+        Retire the read pool and close its idle connections; read_cursor()
+        reopens a pool on demand. Connections still lent out are closed by
+        read_cursor() when they are returned.
+        """
+        with self._read_pool_lock:
+            pool = self._read_pool
+            self._read_pool = None
+        if pool is None:
+            return
+        while True:
+            try:
+                cursor = pool.get_nowait()
+            except queue.Empty:
+                break
+            cursor.connection.close()
+
     def close(self):
         """Close the database connection."""
+        self._close_read_pool()
         if self.conn:
             self.conn.close()
             self.logger.info("Database connection closed")
@@ -117,14 +334,26 @@ class Database:
     def optimize_for_bulk_import(self):
         """
         Configure SQLite settings to optimize performance for bulk data import.
+        
+        The journal stays in WAL mode: leaving WAL needs exclusive access,
+        which other threads' connections and pooled readers would block.
+        With synchronous = OFF, WAL commits skip fsync entirely.
         """
         try:
             self.execute("PRAGMA synchronous = OFF")
-            self.execute("PRAGMA journal_mode = MEMORY")
+            # Checkpoint less often while the WAL fills with new pages
+            self.execute("PRAGMA wal_autocheckpoint = 10000")
             self.execute("PRAGMA temp_store = MEMORY")
             self.execute("PRAGMA cache_size = 100000")
             self.execute("PRAGMA foreign_keys = OFF")
-            self.commit()
+            # Batches take the write lock with BEGIN IMMEDIATE; wait for it
+            # rather than failing with SQLITE_BUSY
+            self.execute("PRAGMA busy_timeout = 60000")
+            with self.transaction():
+                # Cached counts go stale as soon as the import starts writing
+                self.execute("DELETE FROM table_counts")
+                for table in BULK_IMPORT_TABLES:
+                    self._drop_secondary_indexes(table)
             self.logger.info("Database optimized for bulk import")
         except sqlite3.Error as e:
             self.logger.error(f"Error optimizing database for bulk import: {e}")
@@ -135,15 +364,64 @@ class Database:
         Restore normal SQLite settings after completing a bulk import.
         """
         try:
-            self.execute("PRAGMA synchronous = NORMAL")
-            self.execute("PRAGMA journal_mode = DELETE")
-            self.execute("PRAGMA foreign_keys = ON")
-            self.commit()
+            self._recreate_indexes()
+            self.execute("PRAGMA busy_timeout = 5000")  # sqlite3.connect() default
+            self._apply_connection_pragmas(self.conn)
             self.logger.info("Database settings restored to normal")
         except sqlite3.Error as e:
             self.logger.error(f"Error restoring normal database settings: {e}")
             raise
 
+    def _drop_secondary_indexes(self, table):
+        """
+        Drop the explicitly created indexes on table, stashing their DDL so
+        _recreate_indexes() can rebuild them. Indexes backing PRIMARY KEY and
+        UNIQUE constraints have no SQL and are left alone.
+        """
+        self.execute(
+            "SELECT name, sql FROM sqlite_master "
+            "WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+            (table,)
+        )
+        indexes = self.cursor.fetchall()
+        if not indexes:
+            return
+        stashed = self._stashed_indexes.setdefault(table, [])
+        for name, sql in indexes:
+            stashed.append(sql)
+            self.execute(f'DROP INDEX "{name}"')
+        self.logger.info(f"Dropped {len(indexes)} indexes on {table} for bulk import")
+
+    def _recreate_indexes(self):
+        """Rebuild the indexes dropped by _drop_secondary_indexes()."""
+        if not self._stashed_indexes:
+            return
+        with self.transaction():
+            for table, statements in self._stashed_indexes.items():
+                for sql in statements:
+                    self.execute(sql)
+                self.logger.info(f"Recreated {len(statements)} indexes on {table}")
+        self._stashed_indexes = {}
+
+    def compact(self):
+        """
+        Rebuild the database file in place with VACUUM to reclaim space and
+        defragment its B-trees.
+        
+        VACUUM rewrites the file through SQLite's own locking, so connections
+        held by other threads stay valid. The read-only pool is closed first
+        so no pooled reader holds a snapshot open while the file is rebuilt;
+        read_cursor() reopens it on demand.
+        """
+        try:
+            self._close_read_pool()
+            self.execute("VACUUM")
+            self.logger.info(f"Database compacted: {self.db_path}")
+            return True
+        except sqlite3.Error as e:
+            self.logger.error(f"Error compacting database: {e}")
+            return False
+
     def get_file_downloader(self):
         """
         Get a FileDownloader instance (for dataset checks & downloads).
@@ -170,84 +448,375 @@ class Database:
             self.logger.error(f"Error initializing schema: {e}")
             return False
         
-    def batch_insert_books(self, book_records):
-        """Insert multiple book records efficiently."""
-        try:
-            self.executemany(
-                """INSERT OR IGNORE INTO book 
-                (book_id, title, description, isbn, isbn13, 
-                    publisher, publication_date, language_code, pages,
-                    average_rating, ratings_count, text_reviews_count)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""", 
-                book_records
+    def upgrade_schema(self):
+        """Upgrade an existing database to the current schema version."""
+        try:
+            from db.models import upgrade_schema
+            return upgrade_schema(self)
+        except Exception as e:
+            self.logger.error(f"Error upgrading schema: {e}")
+            return False
+
+    def _insert_sql(self, table, columns, rows=1):
+        """
+        Return the INSERT OR IGNORE statement for table and columns with
+        rows VALUES groups, building it once.
+        """
+        key = (table, columns, rows)
+        sql = self._insert_sql_cache.get(key)
+        if sql is None:
+            values = f"({', '.join('?' * len(columns))})"
+            sql = self._insert_sql_cache[key] = (
+                f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) "
+                f"VALUES {', '.join([values] * rows)}"
             )
-            self.commit()
+        return sql
+
+    def _batch_insert(self, table, columns, rows, id_cache=None):
+        """
+        Insert rows into table with a cached INSERT OR IGNORE statement.
+        When id_cache is given, the first column is treated as the external
+        ID and the new internal IDs are recorded in it.
+        """
+        if id_cache is None:
+            self._insert_multirow(table, columns, rows)
+        else:
+            self._insert_with_id_cache(self._insert_sql(table, columns), rows, id_cache)
+
+    def _insert_multirow(self, table, columns, rows):
+        """
+        Insert rows with multi-row VALUES statements, as many rows per
+        statement as MAX_BIND_PARAMS allows. Each statement is stepped once
+        for all its rows instead of once per row as with executemany().
+        The last, partial group goes through the single-row statement so
+        only one multi-row statement per table is ever prepared.
+        """
+        rows_per_stmt = max(1, MAX_BIND_PARAMS // len(columns))
+        sql = self._insert_sql(table, columns, rows_per_stmt)
+        for group in _chunked(rows, rows_per_stmt):
+            if len(group) == rows_per_stmt:
+                self.execute(sql, list(chain.from_iterable(group)))
+            else:
+                self.executemany(self._insert_sql(table, columns), group)
+
+    def _insert_with_id_cache(self, query, records, id_cache):
+        """
+        Insert records whose first column is an external ID, recording the
+        new internal ID of every inserted row in id_cache. Uses RETURNING
+        where available so no follow-up SELECT is needed; records whose
+        external ID is already cached would be ignored and are skipped.
+        """
+        if not SUPPORTS_RETURNING:
+            self.executemany(query, records)
+            return
+        query += " RETURNING id"
+        for record in records:
+            if record[0] in id_cache:
+                continue
+            row = self.execute(query, record).fetchone()
+            if row is not None:
+                id_cache[record[0]] = row[0]
+
+    def batch_insert_books(self, book_records, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Insert multiple book records efficiently.
+        Records carry the description as their third field; it is stored in
+        the book_description side table in the same transaction.
+        book_records may be any iterable (including a generator); it is
+        consumed in chunks of chunk_size rows, one transaction per chunk.
+        """
+        nested = self.conn.in_transaction
+        try:
+            for chunk in _chunked(book_records, chunk_size):
+                with self.transaction():
+                    self._batch_insert(
+                        'book', BOOK_COLUMNS,
+                        [record[:2] + record[3:] for record in chunk],
+                        self._book_id_cache
+                    )
+                    self.executemany(
+                        """INSERT OR IGNORE INTO book_description (book_id, description)
+                        SELECT id, ? FROM book WHERE book_id = ?""",
+                        [(record[2], record[0]) for record in chunk if record[2] is not None]
+                    )
             return True
         except sqlite3.Error as e:
             self.logger.error(f"Error inserting books: {e}")
-            self.rollback()
+            if nested:
+                raise
             return False
 
-    def batch_insert_authors(self, author_records):
-        """Insert multiple author records efficiently."""
+    def batch_insert_authors(self, author_records, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Insert multiple author records efficiently.
+        author_records may be any iterable; it is committed every chunk_size rows.
+        """
+        nested = self.conn.in_transaction
         try:
-            self.executemany(
-                """INSERT OR IGNORE INTO author 
-                (author_id, name, role, profile_url)
-                VALUES (?, ?, ?, ?)""", 
-                author_records
-            )
-            self.commit()
+            for chunk in _chunked(author_records, chunk_size):
+                with self.transaction():
+                    self._batch_insert('author', AUTHOR_COLUMNS, chunk, self._author_id_cache)
             return True
         except sqlite3.Error as e:
             self.logger.error(f"Error inserting authors: {e}")
-            self.rollback()
+            if nested:
+                raise
             return False
         
+    def stage_reviews(self, review_records):
+        """
+        Stage raw review records that still carry external book and user IDs.
+        Records are (review_id, book_id, user_id, rating, review_text,
+        date_added, is_spoiler); flush_staged_reviews() moves them into review.
+        
+        Raises:
+            sqlite3.Error: If staging fails; the staging table is cleared first
+        """
+        try:
+            self.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS staging_review (
+                    review_id TEXT,
+                    ext_book_id TEXT,
+                    ext_user_id TEXT,
+                    rating INTEGER,
+                    review_text TEXT,
+                    date_added TEXT,
+                    is_spoiler BOOLEAN
+                )
+            """)
+            with self.transaction():
+                self.executemany(
+                    """INSERT INTO staging_review
+                    (review_id, ext_book_id, ext_user_id, rating, review_text, date_added, is_spoiler)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                    review_records
+                )
+            return True
+        except sqlite3.Error as e:
+            self.logger.error(f"Error staging reviews: {e}")
+            self.clear_staged_reviews()
+            raise
+
+    def insert_staged_users(self):
+        """
+        Create a user row for every new user ID among the staged reviews,
+        so reviews can be imported in a single pass over the dataset.
+        
+        Returns:
+            int: Number of users inserted
+        
+        Raises:
+            sqlite3.Error: If the insert fails; the staging table is cleared first
+        """
+        try:
+            with self.transaction():
+                self.execute("""
+                    INSERT OR IGNORE INTO user (user_id, username, review_count)
+                    SELECT DISTINCT ext_user_id, 'user_' || ext_user_id, 0
+                    FROM staging_review
+                    WHERE ext_user_id IS NOT NULL AND ext_user_id != ''
+                """)
+                return self.cursor.rowcount
+        except sqlite3.Error as e:
+            self.logger.error(f"Error inserting staged users: {e}")
+            self.clear_staged_reviews()
+            raise
+
+    def flush_staged_reviews(self):
+        """
+        Move staged reviews into review and review_body, resolving external
+        IDs with a single join against book and user. Staged rows whose book
+        or user is unknown, or that have no rating, are dropped.
+        
+        Returns:
+            int: Number of reviews inserted
+        
+        Raises:
+            sqlite3.Error: If the flush fails; the staging table is cleared
+            first, so the batch is never picked up again by a later flush
+        """
+        try:
+            with self.transaction():
+                self.execute("SELECT COALESCE(MAX(id), 0) FROM review")
+                base_id = self.cursor.fetchone()[0]
+                self.execute("""
+                    INSERT INTO review
+                    (id, review_id, book_id, user_id, rating, date_added, is_spoiler)
+                    SELECT ? + s.rowid, s.review_id, b.id, u.id, s.rating, s.date_added, s.is_spoiler
+                    FROM staging_review s
+                    JOIN book b ON b.book_id = s.ext_book_id
+                    JOIN user u ON u.user_id = s.ext_user_id
+                    WHERE s.rating
+                """, (base_id,))
+                inserted = self.cursor.rowcount
+                self.execute("""
+                    INSERT INTO review_body (review_id, review_text)
+                    SELECT r.id, s.review_text
+                    FROM staging_review s
+                    JOIN review r ON r.id = ? + s.rowid
+                    WHERE s.review_text IS NOT NULL
+                """, (base_id,))
+                self.execute("DELETE FROM staging_review")
+            return inserted
+        except sqlite3.Error as e:
+            self.logger.error(f"Error flushing staged reviews: {e}")
+            self.clear_staged_reviews()
+            raise
+
+    def clear_staged_reviews(self):
+        """
+        Discard every staged review. Called on each failure path so a failed
+        batch is not flushed again, with new IDs, alongside the next one.
+        """
+        try:
+            self.cursor.execute("DELETE FROM temp.staging_review")
+        except sqlite3.Error as e:
+            # The staging table may not exist yet if staging itself failed
+            self.logger.debug(f"Could not clear staged reviews: {e}")
+
+    def batch_insert_book_authors(self, book_author_pairs, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Insert (book_id, author_id) pairs, one transaction per chunk_size pairs.
+        Duplicate pairs are ignored by the composite primary key.
+        """
+        nested = self.conn.in_transaction
+        try:
+            for chunk in _chunked(book_author_pairs, chunk_size):
+                with self.transaction():
+                    self._batch_insert('book_authors', ('book_id', 'author_id'), chunk)
+            return True
+        except sqlite3.Error as e:
+            self.logger.error(f"Error inserting book-author relationships: {e}")
+            if nested:
+                raise
+            return False
+
+    def batch_insert_book_genres(self, book_genre_records, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Insert (book_id, genre_id, confidence_score) records, one transaction
+        per chunk_size records. Duplicate pairs are ignored by the composite
+        primary key.
+        """
+        nested = self.conn.in_transaction
+        try:
+            for chunk in _chunked(book_genre_records, chunk_size):
+                with self.transaction():
+                    self._batch_insert('book_genre', ('book_id', 'genre_id', 'confidence_score'), chunk)
+            return True
+        except sqlite3.Error as e:
+            self.logger.error(f"Error inserting book-genre relationships: {e}")
+            if nested:
+                raise
+            return False
+
+    def warm_id_caches(self):
+        """
+        Load the external ID -> internal ID mappings for books and authors
+        into memory with a single scan of each table.
+        """
+        try:
+            self.execute("SELECT book_id, id FROM book")
+            self._book_id_cache = dict(self.cursor.fetchall())
+
+            self.execute("SELECT author_id, id FROM author")
+            self._author_id_cache = dict(self.cursor.fetchall())
+
+            self.logger.info(
+                f"ID caches warmed: {len(self._book_id_cache)} books, "
+                f"{len(self._author_id_cache)} authors"
+            )
+        except sqlite3.Error as e:
+            self.logger.error(f"Error warming ID caches: {e}")
+            raise
+
+    def get_book_id_by_external_id(self, book_id):
+        """
+        Resolve a dataset book ID to the internal book row ID.
+        Consults the in-memory cache first and falls back to the database.
+        """
+        internal_id = self._book_id_cache.get(book_id)
+        if internal_id is None:
+            self.execute("SELECT id FROM book WHERE book_id = ? LIMIT 1", (book_id,))
+            row = self.cursor.fetchone()
+            if row is None:
+                return None
+            internal_id = self._book_id_cache[book_id] = row[0]
+        return internal_id
+
+    def get_author_id_by_external_id(self, author_id):
+        """
+        Resolve a dataset author ID to the internal author row ID.
+        Consults the in-memory cache first and falls back to the database.
+        """
+        internal_id = self._author_id_cache.get(author_id)
+        if internal_id is None:
+            self.execute("SELECT id FROM author WHERE author_id = ? LIMIT 1", (author_id,))
+            row = self.cursor.fetchone()
+            if row is None:
+                return None
+            internal_id = self._author_id_cache[author_id] = row[0]
+        return internal_id
+
     def get_database_stats(self):
         """Get statistics about the database contents."""
         try:
-            stats = {}
-            
-            # Count books
-            self.execute("SELECT COUNT(*) FROM book")
-            stats['books'] = self.cursor.fetchone()[0]
-            
-            # Count authors
-            self.execute("SELECT COUNT(*) FROM author")
-            stats['authors'] = self.cursor.fetchone()[0]
-            
-            # Count users
-            self.execute("SELECT COUNT(*) FROM user")
-            stats['users'] = self.cursor.fetchone()[0]
-            
-            # Count reviews
-            self.execute("SELECT COUNT(*) FROM review")
-            stats['reviews'] = self.cursor.fetchone()[0]
-            
-            return stats
+            with self.read_cursor() as cursor:
+                # Only count the tables that exist; missing ones report 0
+                cursor.execute(_STATS_PREFLIGHT_SQL, _STATS_PREFLIGHT_TABLES)
+                existing = {row[0] for row in cursor.fetchall()}
+                
+                # Prefer the counts cached by the last import
+                counts = {}
+                if 'table_counts' in existing:
+                    cursor.execute("SELECT table_name, record_count FROM table_counts")
+                    counts = dict(cursor.fetchall())
+                
+                uncounted = tuple(
+                    table for table in STATS_TABLES.values()
+                    if table in existing and table not in counts
+                )
+                if uncounted:
+                    # Count the remaining tables in one statement
+                    cursor.execute(_table_counts_query(uncounted))
+                    counts.update(cursor.fetchall())
+            return {label: counts.get(table, 0) for label, table in STATS_TABLES.items()}
         except sqlite3.Error as e:
             self.logger.error(f"Error getting database stats: {e}")
             return {"error": str(e)}
         
+    def refresh_table_counts(self):
+        """
+        Recount the summary tables and cache the results in table_counts,
+        so get_database_stats() does not rescan them on every start.
+        """
+        try:
+            with self.transaction():
+                self.execute(
+                    "INSERT OR REPLACE INTO table_counts (table_name, record_count) "
+                    + _table_counts_query(tuple(STATS_TABLES.values()))
+                )
+            return True
+        except sqlite3.Error as e:
+            self.logger.error(f"Error refreshing table counts: {e}")
+            return False
+
     def get_database_report(self):
         """Get a detailed report about the database contents.
         Should include a listing of all tables and a count of rows in each."""
         try:
-            report = {}
-            
-            # Get table names
-            self.execute(
-                "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
-            )
-            tables = [row[0] for row in self.cursor.fetchall()]
-            
-            # Get row counts for each table
-            for table in tables:
-                self.execute(f"SELECT COUNT(*) FROM {table}")
-                report[table] = self.cursor.fetchone()[0]
-            
-            return report
+            with self.read_cursor() as cursor:
+                # Get table names
+                cursor.execute(
+                    "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
+                )
+                tables = tuple(row[0] for row in cursor.fetchall())
+                
+                if not tables:
+                    return {}
+                
+                # Get row counts for all tables in one statement
+                cursor.execute(_table_counts_query(tables))
+                return dict(cursor.fetchall())
         except sqlite3.Error as e:
             self.logger.error(f"Error getting database report: {e}")
             return {"error": str(e)}
\ No newline at end of file
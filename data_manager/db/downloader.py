@@ -4,7 +4,7 @@ Handles downloading and basic file validation for the UCSD Book Graph dataset.
 """
 
 import logging
-import shutil
+import os
 import urllib.request
 import hashlib
 from pathlib import Path
@@ -98,11 +98,15 @@ class FileDownloader:
         """
         Check if all required dataset files exist and have valid sizes.
         """
+        paths = {key: Path(self.config["data"][key]) for key in DATASET_INFO["files"]}
+        file_sizes = self._scan_file_sizes({path.parent for path in paths.values()})
+
         results = {}
         for file_key, file_info in DATASET_INFO["files"].items():
-            file_path = Path(self.config["data"][file_key])
-            if file_path.exists():
-                size_mb = file_path.stat().st_size / (1024 * 1024)
+            file_path = paths[file_key]
+            size = file_sizes.get((file_path.parent, file_path.name))
+            if size is not None:
+                size_mb = size / (1024 * 1024)
                 # Allow about 10% smaller than the “expected” size
                 min_size = file_info["size_mb"] * 0.9
                 if size_mb < min_size:
@@ -116,6 +120,23 @@ class FileDownloader:
                 results[file_key] = False
         return results
 
+    @staticmethod
+    def _scan_file_sizes(directories) -> Dict[tuple, int]:
+        """
+        List each directory once with os.scandir and return the sizes of the
+        regular files found, keyed by (directory, file name).
+        """
+        sizes = {}
+        for directory in directories:
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_file():
+                            sizes[(directory, entry.name)] = entry.stat().st_size
+            except FileNotFoundError:
+                continue
+        return sizes
+
     def download_file(self, file_key: str, progress_callback: Optional[Callable] = None) -> bool:
         """
         Download a specific dataset file with progress tracking.
@@ -147,7 +168,9 @@ class FileDownloader:
                     f.write(chunk)
                     progress.update(len(chunk))
 
-            shutil.move(str(temp_file), str(destination))
+            # The temporary file sits next to the destination, so this is an
+            # atomic rename on the same filesystem
+            os.replace(temp_file, destination)
             logger.info(f"Successfully downloaded {file_key} dataset")
             return True
         except Exception as e:
@@ -6,13 +6,69 @@ Handles importing of UCSD Book Graph dataset files into the application's databa
 import logging
 import json
 import gzip
+import queue
+import sqlite3
+import threading
 from pathlib import Path
 from typing import Dict, List, Optional, Callable, Iterator
 
+from db.database import SUPPORTS_RETURNING
 from db.downloader import DATASET_INFO, FileDownloader  # or adjust import path as needed
 
 logger = logging.getLogger(__name__)
 
+# Dataset fields in the column order expected by Database.batch_insert_books()
+BOOK_FIELDS = (
+    'book_id', 'title', 'description', 'isbn', 'isbn13', 'publisher',
+    'publication_date', 'language_code', 'num_pages', 'average_rating',
+    'ratings_count', 'text_reviews_count'
+)
+
+# Leading review fields in the column order expected by Database.stage_reviews()
+REVIEW_FIELDS = ('review_id', 'book_id', 'user_id', 'rating')
+
+
+def prefetch(iterable, depth=2):
+    """
+    Iterate over iterable while a background thread reads up to depth items
+    ahead. Used to overlap gzip decompression and JSON parsing of the next
+    chunks with the database inserts for the current one.
+    """
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        # Give up once the consumer has stopped iterating
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except Exception as e:
+            put(e)
+            return
+        put(done)
+
+    producer = threading.Thread(target=produce, name="prefetch", daemon=True)
+    producer.start()
+    try:
+        while (item := buffer.get()) is not done:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        producer.join()
+
 
 class DatasetImporter:
     """
@@ -74,8 +130,7 @@ class DatasetImporter:
         try:
             chunk_size = 1000
             total_books = 0
-            author_set = set()
-            book_author_pairs = []
+            total_book_authors = 0
 
             # Add collection for genres/shelves
             shelf_counts = {}  # shelf_name -> total occurrences
@@ -85,22 +140,19 @@ class DatasetImporter:
 
             total_records_estimate = books_file.stat().st_size // 2000  # Rough estimate
 
-            for chunk_num, books_chunk in enumerate(self.read_json_chunks(books_file, chunk_size)):
+            for chunk_num, books_chunk in enumerate(prefetch(self.read_json_chunks(books_file, chunk_size))):
                 book_records = []
+                # Authors are linked chunk by chunk, so only one chunk's
+                # worth is held in memory
+                chunk_authors = set()
+                chunk_book_authors = []
                 for book in books_chunk:
                     try:
-                        book_id = book.get('book_id')
-                        title = book.get('title', 'Unknown Title')
-                        isbn = book.get('isbn')
-                        isbn13 = book.get('isbn13')
-                        language = book.get('language_code')
-                        avg_rating = book.get('average_rating')
-                        ratings_count = book.get('ratings_count')
-                        text_reviews_count = book.get('text_reviews_count')
-                        publication_date = book.get('publication_date')
-                        publisher = book.get('publisher')
-                        pages = book.get('num_pages')
-                        description = book.get('description')
+                        # Pull every column in one C-level pass over the fields
+                        record = tuple(map(book.get, BOOK_FIELDS))
+                        book_id = record[0]
+                        if 'title' not in book:
+                            record = (book_id, 'Unknown Title') + record[2:]
 
                         # Authors
                         authors = book.get('authors', [])
@@ -112,15 +164,10 @@ class DatasetImporter:
                                     # Use author_id as the primary identifier
                                     # We'll use a placeholder name based on the ID until we can fetch real names
                                     name = f"Author_{author_id}"  # Placeholder name
-                                    author_set.add((author_id, name, role, None))
-                                    book_author_pairs.append((book_id, author_id))
+                                    chunk_authors.add((author_id, name, role, None))
+                                    chunk_book_authors.append((book_id, author_id))
 
-                        # Create book record
-                        book_records.append((
-                            book_id, title, description, isbn, isbn13,
-                            publisher, publication_date, language, pages,
-                            avg_rating, ratings_count, text_reviews_count
-                        ))
+                        book_records.append(record)
 
                         # Extract popular shelves
                         popular_shelves = book.get('popular_shelves', [])
@@ -142,13 +189,21 @@ class DatasetImporter:
                         continue
 
                 if book_records:
-                    logger.info(f"Inserting batch {chunk_num+1} with {len(book_records)} books...")
+                    logger.debug(f"Inserting batch {chunk_num+1} with {len(book_records)} books...")
                     if not self.db.batch_insert_books(book_records):
                         logger.error(f"Failed to insert batch {chunk_num+1}")
                         return False
 
                     total_books += len(book_records)
 
+                # Authors seen in earlier chunks are already in the ID cache
+                # and are skipped by the insert
+                if chunk_authors and not self.db.batch_insert_authors(chunk_authors):
+                    logger.error(f"Failed to insert authors for batch {chunk_num+1}")
+                    return False
+                self._create_book_author_relationships(chunk_book_authors)
+                total_book_authors += len(chunk_book_authors)
+
                 # Update progress
                 if progress_callback and total_records_estimate > 0:
                     progress_percent = min(95, int((total_books / total_records_estimate) * 100))
@@ -157,19 +212,13 @@ class DatasetImporter:
                 if (chunk_num + 1) % 10 == 0:
                     logger.info(f"Progress: {total_books} books processed so far")
 
-            # Now insert authors
-            logger.info(f"Inserting {len(author_set)} unique authors...")
-            author_records = list(author_set)
-            for i in range(0, len(author_records), 5000):
-                batch = author_records[i:i+5000]
-                if not self.db.batch_insert_authors(batch):
-                    logger.error(f"Failed to insert author batch {i//5000 + 1}")
-                    return False
+            logger.info(f"Linked {total_book_authors} book-author pairs")
 
-            # Create book-author relationships
-            self._create_book_author_relationships(book_author_pairs)
+            # Without RETURNING the inserts could not fill the ID caches, so
+            # load the ID mappings once for the book-genre pass
+            if not SUPPORTS_RETURNING:
+                self.db.warm_id_caches()
 
-            self.db.restore_normal_settings()
             logger.info(f"Successfully imported {total_books} books")
 
             logger.info(f"Processing {len(shelf_counts)} unique shelves/genres...")
@@ -186,8 +235,12 @@ class DatasetImporter:
 
         except Exception as e:
             logger.error(f"Error during book import: {e}", exc_info=True)
-            self.db.restore_normal_settings()
             return False
+        finally:
+            # Runs on every exit, including the early returns above, so the
+            # dropped indexes and normal PRAGMAs always come back. The genre
+            # passes run before this, under the bulk settings.
+            self.db.restore_normal_settings()
 
     def _import_genres(self, shelf_counts):
         """Import all shelves as potential genres."""
@@ -201,113 +254,73 @@ class DatasetImporter:
         for shelf, count in sorted_shelves[:50]:
             logger.info(f"  {shelf}: {count}")
         
-        # Insert all shelves in batches
-        batch_size = 5000
-        genre_records = [(name, f"User shelf: {name}", None, count) for name, count in sorted_shelves]
-        
-        for i in range(0, len(genre_records), batch_size):
-            batch = genre_records[i:i+batch_size]
-            try:
+        # Insert all shelves with one executemany in a single transaction.
+        # The (name, count) pairs are bound as they are; SQLite builds the
+        # description from the name
+        try:
+            with self.db.transaction():
                 self.db.executemany(
-                    """INSERT OR IGNORE INTO genre 
+                    """INSERT OR IGNORE INTO genre
                     (name, description, parent_id, usage_count)
-                    VALUES (?, ?, ?, ?)""",
-                    batch
+                    VALUES (?1, 'User shelf: ' || ?1, NULL, ?2)""",
+                    sorted_shelves
                 )
-                self.db.commit()
-                logger.info(f"Inserted genre batch {i//batch_size + 1}/{(len(genre_records)-1)//batch_size + 1}")
-            except Exception as e:
-                logger.error(f"Failed to insert genre batch: {e}")
-                self.db.rollback()
+            logger.info(f"Inserted {len(sorted_shelves)} genres")
+        except Exception as e:
+            logger.error(f"Failed to insert genres: {e}")
 
     def _create_book_genre_relationships(self, book_shelf_pairs):
         """Create relationships between books and genres with confidence scores."""
         logger.info(f"Creating {len(book_shelf_pairs)} book-genre relationships...")
         
-        # Build ID mappings
-        book_id_map = {}
-        cursor = self.db.execute("SELECT id, book_id FROM book")
-        for row in cursor.fetchall():
-            book_id_map[row[1]] = row[0]
-        
+        # Build ID mappings (book IDs come from the database's ID cache)
         genre_id_map = {}
         cursor = self.db.execute("SELECT id, name FROM genre")
         for row in cursor.fetchall():
             genre_id_map[row[1]] = row[0]
         
-        # Create relationship records
-        relationship_records = []
-        for book_id, shelf_name, count in book_shelf_pairs:
-            if book_id in book_id_map and shelf_name in genre_id_map:
-                internal_book_id = book_id_map[book_id]
-                genre_id = genre_id_map[shelf_name]
-                # Use count as confidence score
-                relationship_records.append((internal_book_id, genre_id, count))
+        # Create relationship records lazily (count is the confidence score),
+        # so only one batch is held in memory at a time
+        get_book_id = self.db.get_book_id_by_external_id
+        relationship_records = (
+            (internal_book_id, genre_id_map[shelf_name], count)
+            for book_id, shelf_name, count in book_shelf_pairs
+            if shelf_name in genre_id_map
+            and (internal_book_id := get_book_id(book_id)) is not None
+        )
         
-        # Insert relationships in batches
-        batch_size = 10000
-        total_inserted = 0
-        
-        for i in range(0, len(relationship_records), batch_size):
-            batch = relationship_records[i:i+batch_size]
-            try:
-                self.db.executemany(
-                    "INSERT OR IGNORE INTO book_genre (book_id, genre_id, confidence_score) VALUES (?, ?, ?)",
-                    batch
-                )
-                self.db.commit()
-                total_inserted += len(batch)
-                logger.info(
-                    f"Inserted book-genre relationship batch "
-                    f"{i//batch_size + 1}/{(len(relationship_records)-1)//batch_size + 1} "
-                    f"({total_inserted}/{len(relationship_records)})"
-                )
-            except Exception as e:
-                logger.error(f"Failed to insert book-genre relationship batch: {e}")
-                self.db.rollback()
+        # All chunks share one transaction; batch_insert_book_genres()
+        # resolves each chunk before inserting it, since the ID lookups
+        # share the database cursor. A failed chunk raises out of the
+        # transaction, so no partial set of links is committed
+        try:
+            with self.db.transaction():
+                self.db.batch_insert_book_genres(relationship_records)
+            logger.info("Inserted book-genre relationships")
+        except sqlite3.Error as e:
+            logger.error(f"Failed to insert book-genre relationships: {e}")
 
     def _create_book_author_relationships(self, book_author_pairs):
         """Create relationships between books and authors."""
-        logger.info(f"Creating {len(book_author_pairs)} book-author relationships...")
-
-        # Build ID mappings
-        book_id_map = {}
-        cursor = self.db.execute("SELECT id, book_id FROM book")
-        for row in cursor.fetchall():
-            book_id_map[row[1]] = row[0]
-
-        author_id_map = {}
-        cursor = self.db.execute("SELECT id, author_id FROM author")
-        for row in cursor.fetchall():
-            author_id_map[row[1]] = row[0]
-
-        # Create relationship records
-        relationship_records = []
-        for ext_book_id, author_id in book_author_pairs:
-            if ext_book_id in book_id_map and author_id in author_id_map:
-                relationship_records.append((book_id_map[ext_book_id], author_id_map[author_id]))
-
-        # Insert relationships in batches
-        batch_size = 10000
-        total_inserted = 0
-        
-        for i in range(0, len(relationship_records), batch_size):
-            batch = relationship_records[i:i+batch_size]
-            try:
-                self.db.executemany(
-                    "INSERT OR IGNORE INTO book_authors (book_id, author_id) VALUES (?, ?)",
-                    batch
-                )
-                self.db.commit()
-                total_inserted += len(batch)
-                logger.info(
-                    f"Inserted book-author relationship batch "
-                    f"{i//batch_size + 1}/{(len(relationship_records)-1)//batch_size + 1} "
-                    f"({total_inserted}/{len(relationship_records)})"
-                )
-            except Exception as e:
-                logger.error(f"Failed to insert book-author relationship batch: {e}")
-                self.db.rollback()
+        logger.debug(f"Creating {len(book_author_pairs)} book-author relationships...")
+
+        # Create relationship records lazily; batch_insert_book_authors()
+        # resolves each chunk before inserting it. Book and author IDs come
+        # from the database's ID caches, filled when they were inserted
+        get_book_id = self.db.get_book_id_by_external_id
+        get_author_id = self.db.get_author_id_by_external_id
+        relationship_records = (
+            (internal_book_id, internal_author_id)
+            for ext_book_id, author_id in book_author_pairs
+            if (internal_author_id := get_author_id(author_id)) is not None
+            and (internal_book_id := get_book_id(ext_book_id)) is not None
+        )
+
+        # The composite primary key deduplicates pairs
+        if self.db.batch_insert_book_authors(relationship_records):
+            logger.debug("Inserted book-author relationships")
+        else:
+            logger.error("Failed to insert book-author relationships")
 
     def import_reviews(self, limit=None, progress_callback=None):
         """Import reviews from the dataset into the database."""
@@ -319,105 +332,37 @@ class DatasetImporter:
         logger.info(f"Importing reviews from {reviews_file}...")
         try:
             chunk_size = 10000
-            logger.info("First pass: collecting unique user IDs...")
             
             # Ensure limit is a number or None, not a function
             review_limit = limit
             if callable(review_limit):
                 review_limit = None
                 
-            self._import_users_from_reviews(reviews_file, chunk_size, review_limit, progress_callback)
+            # Review indexes are rebuilt once the load finishes
+            self.db.optimize_for_bulk_import()
 
-            logger.info("Second pass: importing reviews...")
+            # Users are created from each staged batch, so the file is
+            # read only once
             self._import_review_records(reviews_file, chunk_size, review_limit, progress_callback)
             return True
         except Exception as e:
             logger.error(f"Error during review import: {e}", exc_info=True)
             return False
-
-    def _import_users_from_reviews(self, reviews_file, chunk_size, limit=None, progress_callback=None):
-        user_ids = set()
-        reviews_processed = 0
-
-        for chunk_num, reviews_chunk in enumerate(self.read_json_chunks(reviews_file, chunk_size)):
-            for review in reviews_chunk:
-                user_id = review.get('user_id')
-                if user_id:
-                    user_ids.add(user_id)
-
-            reviews_processed += len(reviews_chunk)
-            logger.info(f"Processed {reviews_processed} reviews, found {len(user_ids)} unique users")
-
-            # Update progress (first 30%)
-            if progress_callback:
-                progress_callback(min(30, int((reviews_processed / (limit or 1e9)) * 30)))
-
-            if limit and reviews_processed >= limit:
-                break
-
-        logger.info(f"Found {len(user_ids)} unique users")
-        logger.info("Inserting users...")
-
-        user_records = [(uid, f"user_{uid}", 0, None, None) for uid in user_ids]
-        batch_size = 10000
-        total_batches = (len(user_records) - 1) // batch_size + 1
-
-        for i in range(0, len(user_records), batch_size):
-            batch = user_records[i:i+batch_size]
-            batch_num = i // batch_size + 1
-            logger.info(f"Inserting user batch {batch_num}/{total_batches}...")
-
-            try:
-                self.db.executemany(
-                    "INSERT OR IGNORE INTO user (user_id, username, review_count, rating_avg, rating_stddev) "
-                    "VALUES (?, ?, ?, ?, ?)",
-                    batch
-                )
-                self.db.commit()
-
-                # Update progress (30% -> 50%)
-                if progress_callback:
-                    progress_percent = 30 + min(20, int((batch_num / total_batches) * 20))
-                    progress_callback(progress_percent)
-            except Exception as e:
-                logger.error(f"Failed to insert user batch {batch_num}: {e}")
-                self.db.rollback()
+        finally:
+            self.db.restore_normal_settings()
 
     def _import_review_records(self, reviews_file, chunk_size, limit=None, progress_callback=None):
-        logger.info("Building ID mappings...")
-        book_id_map = {}
-        cursor = self.db.execute("SELECT id, book_id FROM book")
-        for row in cursor.fetchall():
-            book_id_map[row[1]] = row[0]
-
-        user_id_map = {}
-        cursor = self.db.execute("SELECT id, user_id FROM user")
-        for row in cursor.fetchall():
-            user_id_map[row[1]] = row[0]
-
         reviews_processed = 0
         reviews_skipped = 0
+        users_created = 0
 
-        for chunk_num, reviews_chunk in enumerate(self.read_json_chunks(reviews_file, chunk_size)):
+        for chunk_num, reviews_chunk in enumerate(prefetch(self.read_json_chunks(reviews_file, chunk_size))):
             review_records = []
 
             for review in reviews_chunk:
                 try:
-                    user_id = review.get('user_id')
-                    book_id = review.get('book_id')
-                    rating = review.get('rating')
-                    if not user_id or not book_id or not rating:
-                        reviews_skipped += 1
-                        continue
-
-                    if user_id not in user_id_map or book_id not in book_id_map:
-                        reviews_skipped += 1
-                        continue
-
-                    internal_user_id = user_id_map[user_id]
-                    internal_book_id = book_id_map[book_id]
-                    review_id = review.get('review_id')
-
+                    # Records without a user, book or rating are filtered out
+                    # by flush_staged_reviews() for the whole batch at once
                     review_sentences_list = review.get('review_sentences', [])
                     # Combine the second element (the sentence string) from each sublist
                     review_text = " ".join([sentence_data[1] for sentence_data in review_sentences_list if isinstance(sentence_data, list) and len(sentence_data) > 1])
@@ -431,58 +376,57 @@ class DatasetImporter:
                     # Simplified spoiler flag processing based on example record
                     spoiler_flag = 1 if review.get('has_spoiler', False) else 0
 
-                    # Sentiment processing remains the same
-                    has_sentiment = 0
-                    sentiment_score = None
-                    sentiment_magnitude = None
-
-                    # Append the record - ensure tuple order matches INSERT statement below
-                    review_records.append((
-                        review_id,
-                        internal_book_id,
-                        internal_user_id,
-                        rating,
-                        review_text, # Uses the newly constructed review_text
-                        date_added,
-                        spoiler_flag,
-                        has_sentiment,
-                        sentiment_score,
-                        sentiment_magnitude,
-                        0  # helpful_votes - Assuming 0 as it's not in example JSON
-                    ))
+                    # Stage the record with external IDs; the database resolves
+                    # them to internal IDs in one join when the batch is flushed.
+                    # Sentiment fields and helpful_votes take their column defaults.
+                    review_records.append(
+                        tuple(map(review.get, REVIEW_FIELDS))
+                        + (review_text, date_added, spoiler_flag)
+                    )
                 except Exception as e:
                     logger.debug(f"Error processing review: {e}")
                     reviews_skipped += 1
                     continue
 
             if review_records:
-                logger.info(f"Inserting reviews batch {chunk_num+1} with {len(review_records)} reviews...")
+                logger.debug(f"Inserting reviews batch {chunk_num+1} with {len(review_records)} reviews...")
+                # Staging, user creation and the flush share one commit; the
+                # helpers raise on failure, so a failed batch rolls back whole
                 try:
-                    self.db.executemany(
-                        """INSERT OR IGNORE INTO review
-                            (review_id, book_id, user_id, rating, review_text, date_added,
-                            is_spoiler, has_sentiment, sentiment_score, sentiment_magnitude, helpful_votes)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                        review_records
-                    )
-                    self.db.commit()
-                    reviews_processed += len(review_records)
-
-                    # Update progress (50% -> 100%)
-                    if progress_callback and limit:
-                        progress_percent = 50 + min(50, int((reviews_processed / limit) * 50))
-                        progress_callback(progress_percent)
-                except Exception as e:
+                    with self.db.transaction():
+                        self.db.stage_reviews(review_records)
+                        new_users = self.db.insert_staged_users()
+                        inserted = self.db.flush_staged_reviews()
+                except sqlite3.Error as e:
                     logger.error(f"Failed to insert reviews batch {chunk_num+1}: {e}")
-                    self.db.rollback()
+                    # The rollback already dropped this batch's staged rows;
+                    # clear anything left so the next flush starts empty
+                    self.db.clear_staged_reviews()
+                    inserted = None
+
+                if inserted is not None:
+                    users_created += new_users
+                    reviews_processed += inserted
+                    # Reviews whose book or user is unknown are dropped by the join
+                    reviews_skipped += len(review_records) - inserted
+
+                    # Update progress
+                    if progress_callback and limit:
+                        progress_callback(min(100, int((reviews_processed / limit) * 100)))
+                else:
+                    reviews_skipped += len(review_records)
 
-            logger.info(f"Progress: {reviews_processed} reviews imported, {reviews_skipped} skipped")
+            if (chunk_num + 1) % 10 == 0:
+                logger.info(f"Progress: {reviews_processed} reviews imported, {reviews_skipped} skipped")
 
             if limit and reviews_processed >= limit:
                 logger.info(f"Reached import limit of {limit} reviews")
                 break
 
-        logger.info(f"Successfully imported {reviews_processed} reviews")
+        logger.info(
+            f"Successfully imported {reviews_processed} reviews from {users_created} new users "
+            f"({reviews_skipped} skipped)"
+        )
         if progress_callback:
             progress_callback(100)
 
@@ -512,5 +456,12 @@ class DatasetImporter:
         # TODO: Import interactions if needed
         # self.import_interactions(...)
 
+        # Cache the row counts shown on the dashboard
+        self.db.refresh_table_counts()
+
+        # Reclaim space and defragment the tables after the bulk load
+        logger.info("Compacting database...")
+        self.db.compact()
+
         logger.info("Dataset import completed successfully")
         return True
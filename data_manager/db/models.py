@@ -7,13 +7,188 @@ and initialize the database tables.
 
 import sqlite3
 import logging
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
+SCHEMA_VERSION = '1.2'
+
+# ALTER TABLE ... DROP COLUMN requires SQLite 3.35+
+SUPPORTS_DROP_COLUMN = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+_SCHEMA_SQL = """
+BEGIN;
+
+-- Create the 'author' table
+CREATE TABLE IF NOT EXISTS author (
+    id INTEGER PRIMARY KEY,
+    author_id TEXT,
+    name TEXT NOT NULL,
+    role TEXT,
+    profile_url TEXT,
+    UNIQUE(author_id)
+);
+
+-- Create the 'book' table
+CREATE TABLE IF NOT EXISTS book (
+    id INTEGER PRIMARY KEY,
+    book_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    isbn TEXT,
+    isbn13 TEXT,
+    publisher TEXT,
+    publication_date TEXT,
+    language_code TEXT,
+    pages INTEGER,
+    average_rating REAL,
+    ratings_count INTEGER,
+    text_reviews_count INTEGER,
+    image_url TEXT,
+    UNIQUE(book_id)
+);
+
+-- Create the 'book_description' table (long text kept off the book rows)
+CREATE TABLE IF NOT EXISTS book_description (
+    book_id INTEGER PRIMARY KEY,
+    description TEXT,
+    FOREIGN KEY (book_id) REFERENCES book (id) ON DELETE CASCADE
+);
+
+-- Create the 'book_authors' table (many-to-many relationship)
+CREATE TABLE IF NOT EXISTS book_authors (
+    book_id INTEGER,
+    author_id INTEGER,
+    PRIMARY KEY (book_id, author_id),
+    FOREIGN KEY (book_id) REFERENCES book (id) ON DELETE CASCADE,
+    FOREIGN KEY (author_id) REFERENCES author (id) ON DELETE CASCADE
+);
+
+-- Create the 'user' table
+CREATE TABLE IF NOT EXISTS user (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    username TEXT,
+    review_count INTEGER DEFAULT 0,
+    rating_avg REAL,
+    rating_stddev REAL,
+    UNIQUE(user_id)
+);
+
+-- Create the 'review' table
+CREATE TABLE IF NOT EXISTS review (
+    id INTEGER PRIMARY KEY,
+    review_id TEXT,
+    book_id INTEGER,
+    user_id INTEGER,
+    rating INTEGER,
+    date_added TEXT,
+    is_spoiler BOOLEAN DEFAULT 0,
+    has_sentiment BOOLEAN DEFAULT 0,
+    sentiment_score REAL,
+    sentiment_magnitude REAL,
+    helpful_votes INTEGER DEFAULT 0,
+    FOREIGN KEY (book_id) REFERENCES book (id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES user (id) ON DELETE CASCADE
+);
+
+-- Create the 'review_body' table (long text kept off the review rows)
+CREATE TABLE IF NOT EXISTS review_body (
+    review_id INTEGER PRIMARY KEY,
+    review_text TEXT,
+    FOREIGN KEY (review_id) REFERENCES review (id) ON DELETE CASCADE
+);
+
+-- Covering indexes for the per-user and per-book rating aggregates
+CREATE INDEX IF NOT EXISTS ix_review_user ON review (user_id, rating);
+CREATE INDEX IF NOT EXISTS ix_review_book ON review (book_id, rating);
+
+-- Full-text index over review_body, kept in sync by the triggers below
+CREATE VIRTUAL TABLE IF NOT EXISTS review_fts USING fts5(
+    review_text,
+    content='review_body',
+    content_rowid='review_id'
+);
+
+CREATE TRIGGER IF NOT EXISTS review_body_ai AFTER INSERT ON review_body BEGIN
+    INSERT INTO review_fts (rowid, review_text) VALUES (new.review_id, new.review_text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS review_body_ad AFTER DELETE ON review_body BEGIN
+    INSERT INTO review_fts (review_fts, rowid, review_text)
+    VALUES ('delete', old.review_id, old.review_text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS review_body_au AFTER UPDATE ON review_body BEGIN
+    INSERT INTO review_fts (review_fts, rowid, review_text)
+    VALUES ('delete', old.review_id, old.review_text);
+    INSERT INTO review_fts (rowid, review_text) VALUES (new.review_id, new.review_text);
+END;
+
+-- Create the 'genre' table
+CREATE TABLE IF NOT EXISTS genre (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE,
+    description TEXT,
+    parent_id INTEGER,
+    usage_count INTEGER DEFAULT 0,
+    FOREIGN KEY (parent_id) REFERENCES genre (id) ON DELETE SET NULL
+);
+
+-- Create the 'book_genre' table (many-to-many relationship)
+CREATE TABLE IF NOT EXISTS book_genre (
+    book_id INTEGER,
+    genre_id INTEGER,
+    confidence_score REAL,
+    PRIMARY KEY (book_id, genre_id),
+    FOREIGN KEY (book_id) REFERENCES book (id) ON DELETE CASCADE,
+    FOREIGN KEY (genre_id) REFERENCES genre (id) ON DELETE CASCADE
+);
+
+-- Create the 'metadata' table for database information
+CREATE TABLE IF NOT EXISTS metadata (
+    key TEXT PRIMARY KEY,
+    value TEXT,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create the 'table_counts' table (row counts cached after each import)
+CREATE TABLE IF NOT EXISTS table_counts (
+    table_name TEXT PRIMARY KEY,
+    record_count INTEGER NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMIT;
+"""
+
+def _has_column(db, table, column):
+    """
+    Check whether a table has a given column.
+    
+    Uses the table-valued pragma_table_info() so SQLite filters the schema
+    rows itself instead of returning every column to Python.
+    
+    Args:
+        db (Database): Database connection instance
+        table (str): Table name
+        column (str): Column name
+    
+    Returns:
+        bool: True if the column exists, False otherwise
+    """
+    db.execute(
+        "SELECT 1 FROM pragma_table_info(?) WHERE name = ? LIMIT 1",
+        (table, column)
+    )
+    return db.cursor.fetchone() is not None
+
 def create_tables(db):
     """
     Create all necessary tables in the database.
     
+    The whole schema is run as one script so it is parsed and executed in a
+    single call inside one transaction.
+    
     Args:
         db (Database): Database connection instance
     
@@ -21,129 +196,122 @@ def create_tables(db):
         bool: True if successful, False otherwise
     """
     try:
-        # Start a transaction for all table creations
-        db.execute("BEGIN TRANSACTION")
-        
-        # Create the 'author' table
-        db.execute("""
-            CREATE TABLE IF NOT EXISTS author (
-                id INTEGER PRIMARY KEY,
-                author_id TEXT,
-                name TEXT NOT NULL,
-                role TEXT,
-                profile_url TEXT,
-                UNIQUE(author_id)
-            )
-        """)
-        
-        # Create the 'book' table
-        db.execute("""
-            CREATE TABLE IF NOT EXISTS book (
-                id INTEGER PRIMARY KEY,
-                book_id TEXT NOT NULL,
-                title TEXT NOT NULL,
-                description TEXT,
-                isbn TEXT,
-                isbn13 TEXT,
-                publisher TEXT,
-                publication_date TEXT,
-                language_code TEXT,
-                pages INTEGER,
-                average_rating REAL,
-                ratings_count INTEGER,
-                text_reviews_count INTEGER,
-                image_url TEXT,
-                UNIQUE(book_id)
-            )
-        """)
-        
-        # Create the 'book_authors' table (many-to-many relationship)
-        db.execute("""
-            CREATE TABLE IF NOT EXISTS book_authors (
-                book_id INTEGER,
-                author_id INTEGER,
-                PRIMARY KEY (book_id, author_id),
-                FOREIGN KEY (book_id) REFERENCES book (id) ON DELETE CASCADE,
-                FOREIGN KEY (author_id) REFERENCES author (id) ON DELETE CASCADE
-            )
-        """)
+        db.conn.executescript(_SCHEMA_SQL)
+        logger.info("Database tables created successfully")
+        return True
+    except sqlite3.Error as e:
+        db.rollback()
+        logger.error(f"Error creating tables: {e}")
+        return False
         
-        # Create the 'user' table
-        db.execute("""
-            CREATE TABLE IF NOT EXISTS user (
-                id INTEGER PRIMARY KEY,
-                user_id TEXT NOT NULL,
-                username TEXT,
-                review_count INTEGER DEFAULT 0,
-                rating_avg REAL,
-                rating_stddev REAL,
-                UNIQUE(user_id)
-            )
-        """)
+_SCHEMA_OBJECTS_SQL = "SELECT name FROM sqlite_master WHERE type IN ('table', 'index', 'trigger')"
+
+@lru_cache(maxsize=1)
+def _expected_schema_objects():
+    """
+    Get the names of the current schema's tables, indexes and triggers by
+    building the schema in memory once.
+    
+    Returns:
+        frozenset: Object names
+    """
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.executescript(_SCHEMA_SQL)
+        return frozenset(name for name, in conn.execute(_SCHEMA_OBJECTS_SQL))
+    finally:
+        conn.close()
+
+def _version_tuple(version):
+    """Convert a version string like '1.1' into a comparable tuple."""
+    return tuple(int(part) for part in version.split('.'))
+
+def _set_schema_version(db, version):
+    """Record the schema version in the metadata table."""
+    db.execute("""
+        INSERT OR REPLACE INTO metadata (key, value, updated_at)
+        VALUES ('schema_version', ?, CURRENT_TIMESTAMP)
+    """, (version,))
+
+def _move_column_to_side_table(db, table, column, side_table, key_column):
+    """
+    Copy a column into its side table and drop it from the main table.
+    SQLite versions without DROP COLUMN keep the column, emptied to NULL;
+    nothing reads or writes it after the move.
+    
+    Args:
+        db (Database): Database connection instance
+        table (str): Table the column is moved out of
+        column (str): Column to move
+        side_table (str): Side table receiving the values
+        key_column (str): Side table column referencing table.id
+    """
+    if not _has_column(db, table, column):
+        return
+    db.execute(f"""
+        INSERT OR IGNORE INTO {side_table} ({key_column}, {column})
+        SELECT id, {column} FROM {table} WHERE {column} IS NOT NULL
+    """)
+    if SUPPORTS_DROP_COLUMN:
+        db.execute(f"ALTER TABLE {table} DROP COLUMN {column}")
+    else:
+        db.execute(f"UPDATE {table} SET {column} = NULL WHERE {column} IS NOT NULL")
+    logger.info(f"Moved {table}.{column} into {side_table}")
+
+def _upgrade_to_1_1(db):
+    """
+    Move book descriptions and review text into side tables so scans over
+    book and review only touch the narrow scalar columns.
+    """
+    _move_column_to_side_table(db, 'book', 'description', 'book_description', 'book_id')
+    _move_column_to_side_table(db, 'review', 'review_text', 'review_body', 'review_id')
+    _set_schema_version(db, '1.1')
+
+def _upgrade_to_1_2(db):
+    """Index the existing review text in the new review_fts table."""
+    db.execute("INSERT INTO review_fts (review_fts) VALUES ('rebuild')")
+    _set_schema_version(db, '1.2')
+
+def upgrade_schema(db):
+    """
+    Bring an existing database up to the current schema version.
+    
+    Args:
+        db (Database): Database connection instance
         
-        # Create the 'review' table
-        db.execute("""
-            CREATE TABLE IF NOT EXISTS review (
-                id INTEGER PRIMARY KEY,
-                review_id TEXT,
-                book_id INTEGER,
-                user_id INTEGER,
-                rating INTEGER,
-                review_text TEXT,
-                date_added TEXT,
-                is_spoiler BOOLEAN DEFAULT 0,
-                has_sentiment BOOLEAN DEFAULT 0,
-                sentiment_score REAL,
-                sentiment_magnitude REAL,
-                helpful_votes INTEGER DEFAULT 0,
-                FOREIGN KEY (book_id) REFERENCES book (id) ON DELETE CASCADE,
-                FOREIGN KEY (user_id) REFERENCES user (id) ON DELETE CASCADE
-            )
-        """)
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    try:
+        # Create any tables, indexes or triggers added since the database was built.
+        # The stored CREATE text is not compared: ALTER TABLE rewrites it, so
+        # upgraded databases never match a fresh build verbatim
+        db.execute(_SCHEMA_OBJECTS_SQL)
+        current = {name for name, in db.cursor.fetchall()}
+        if not _expected_schema_objects() <= current and not create_tables(db):
+            return False
         
-        # Create the 'genre' table
-        # In the create_tables function, update the genre table definition
-        db.execute("""
-            CREATE TABLE IF NOT EXISTS genre (
-                id INTEGER PRIMARY KEY,
-                name TEXT UNIQUE,
-                description TEXT,
-                parent_id INTEGER,
-                usage_count INTEGER DEFAULT 0,
-                FOREIGN KEY (parent_id) REFERENCES genre (id) ON DELETE SET NULL
-            )
-        """)
+        db.execute("SELECT value FROM metadata WHERE key = 'schema_version'")
+        row = db.cursor.fetchone()
+        version = row[0] if row else '1.0'
+        if version == SCHEMA_VERSION:
+            return True
         
-        # Create the 'book_genre' table (many-to-many relationship)
-        db.execute("""
-            CREATE TABLE IF NOT EXISTS book_genre (
-                book_id INTEGER,
-                genre_id INTEGER,
-                confidence_score REAL,
-                PRIMARY KEY (book_id, genre_id),
-                FOREIGN KEY (book_id) REFERENCES book (id) ON DELETE CASCADE,
-                FOREIGN KEY (genre_id) REFERENCES genre (id) ON DELETE CASCADE
-            )
-        """)
+        if _version_tuple(version) < (1, 1):
+            logger.info(f"Upgrading database schema from {version} to 1.1")
+            with db.transaction():
+                _upgrade_to_1_1(db)
         
-        # Create the 'metadata' table for database information
-        db.execute("""
-            CREATE TABLE IF NOT EXISTS metadata (
-                key TEXT PRIMARY KEY,
-                value TEXT,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+        if _version_tuple(version) < (1, 2):
+            logger.info(f"Upgrading database schema from {version} to 1.2")
+            with db.transaction():
+                _upgrade_to_1_2(db)
         
-        # Commit the transaction
-        db.commit()
-        logger.info("Database tables created successfully")
         return True
     except sqlite3.Error as e:
-        db.rollback()
-        logger.error(f"Error creating tables: {e}")
+        logger.error(f"Error upgrading database schema: {e}")
         return False
-        
+
 def initialize_database(db):
     """
     Initialize the database with required schema and initial data.
@@ -159,12 +327,6 @@ def initialize_database(db):
         if not create_tables(db):
             return False
             
-        # Initialize metadata
-        db.execute("""
-            INSERT OR REPLACE INTO metadata (key, value, updated_at)
-            VALUES ('schema_version', '1.0', CURRENT_TIMESTAMP)
-        """)
-        
         # Initialize basic genres if they don't exist
         base_genres = [
             ('Fiction', 'Fictional works of literature', None, 0),
@@ -179,15 +341,17 @@ def initialize_database(db):
             ('Self-Help', 'Books intended to help readers improve their lives', 2, 0)
         ]
 
-        db.executemany("""
-            INSERT OR IGNORE INTO genre (name, description, parent_id, usage_count)
-            VALUES (?, ?, ?, ?)
-        """, base_genres)
+        with db.transaction():
+            # Initialize metadata
+            _set_schema_version(db, SCHEMA_VERSION)
+            
+            db.executemany("""
+                INSERT OR IGNORE INTO genre (name, description, parent_id, usage_count)
+                VALUES (?, ?, ?, ?)
+            """, base_genres)
         
-        db.commit()
         logger.info("Database successfully initialized")
         return True
     except sqlite3.Error as e:
-        db.rollback()
         logger.error(f"Error initializing database: {e}")
         return False
\ No newline at end of file
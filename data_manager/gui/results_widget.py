@@ -6,6 +6,9 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import Qt, pyqtSlot, pyqtSignal
 
+# Star strings for ratings 0-5, indexed by rating
+_STAR_STRINGS = tuple("★" * i + "☆" * (5 - i) for i in range(6))
+
 class ResultsWidget(QWidget):
     """Widget to display search results and analysis findings."""
 
@@ -71,18 +74,32 @@ class ResultsWidget(QWidget):
             self.review_text.setText("No results found matching the criteria.")
             return
             
-        # Populate the table with results
-        self.table_widget.setRowCount(len(results))
-        
-        for row, user_data in enumerate(results):
-            self.table_widget.setItem(row, 0, QTableWidgetItem(str(user_data['user_id'])))
-            self.table_widget.setItem(row, 1, QTableWidgetItem(str(user_data['review_count'])))
-            self.table_widget.setItem(row, 2, QTableWidgetItem(f"{user_data['avg_rating']:.2f}"))
-            self.table_widget.setItem(row, 3, QTableWidgetItem(f"{user_data['rating_stddev']:.2f}"))
+        # Populate the table with results. Repaints, sorting and item
+        # signals are suspended until every row is in, so the table is
+        # laid out once instead of once per cell
+        table = self.table_widget
+        sorting_enabled = table.isSortingEnabled()
+        table.setSortingEnabled(False)
+        table.setUpdatesEnabled(False)
+        table.blockSignals(True)
+        try:
+            table.setRowCount(len(results))
             
-            # Try to get top genre if available
-            top_genre = user_data.get('top_genre', "Unknown")
-            self.table_widget.setItem(row, 4, QTableWidgetItem(top_genre))
+            for row, user_data in enumerate(results):
+                # Try to get top genre if available
+                cells = (
+                    str(user_data['user_id']),
+                    str(user_data['review_count']),
+                    f"{user_data['avg_rating']:.2f}",
+                    f"{user_data['rating_stddev']:.2f}",
+                    user_data.get('top_genre', "Unknown"),
+                )
+                for column, text in enumerate(cells):
+                    table.setItem(row, column, QTableWidgetItem(text))
+        finally:
+            table.blockSignals(False)
+            table.setUpdatesEnabled(True)
+            table.setSortingEnabled(sorting_enabled)
             
         self.review_text.setText(f"Found {len(results)} negative reviewers matching criteria.")
         
@@ -104,40 +121,39 @@ class ResultsWidget(QWidget):
                 self.review_text.setText(f"Error: {user_details['error']}")
                 return
                 
-            # Display user details
-            details_text = f"User ID: {user_id}\n\n"
-            details_text += f"Average Rating: {user_details['avg_rating']:.2f} (StdDev: {user_details['rating_stddev']:.2f})\n"
-            details_text += f"Reviews: {user_details['review_count']}\n"
+            # Display user details; the parts are joined once at the end
+            parts = [
+                f"User ID: {user_id}\n\n",
+                f"Average Rating: {user_details['avg_rating']:.2f} (StdDev: {user_details['rating_stddev']:.2f})\n",
+                f"Reviews: {user_details['review_count']}\n",
+            ]
             
             # Add rating distribution
-            details_text += f"\nRating Distribution:\n"
-            details_text += f"★☆☆☆☆: {user_details.get('rating_1_count', 0)} reviews\n"
-            details_text += f"★★☆☆☆: {user_details.get('rating_2_count', 0)} reviews\n"
-            details_text += f"★★★☆☆: {user_details.get('rating_3_count', 0)} reviews\n"
-            details_text += f"★★★★☆: {user_details.get('rating_4_count', 0)} reviews\n"
-            details_text += f"★★★★★: {user_details.get('rating_5_count', 0)} reviews\n"
+            parts.append("\nRating Distribution:\n")
+            for rating in range(1, 6):
+                parts.append(f"{_STAR_STRINGS[rating]}: {user_details.get(f'rating_{rating}_count', 0)} reviews\n")
             
-            details_text += f"\nTop Genre: {user_details['top_genre']}\n"
-            details_text += f"Average Review Length: {int(user_details.get('avg_review_length', 0))} characters\n"
-            details_text += f"Review Period: {user_details.get('first_review_date', 'Unknown')} - {user_details.get('last_review_date', 'Unknown')}\n"
+            parts.append(f"\nTop Genre: {user_details['top_genre']}\n")
+            parts.append(f"Average Review Length: {int(user_details.get('avg_review_length', 0))} characters\n")
+            parts.append(f"Review Period: {user_details.get('first_review_date', 'Unknown')} - {user_details.get('last_review_date', 'Unknown')}\n")
             
-            details_text += "\nRecent Reviews:\n"
+            parts.append("\nRecent Reviews:\n")
             for i, review in enumerate(user_details.get('reviews', [])):
-                stars = "★" * review['rating'] + "☆" * (5 - review['rating'])
-                details_text += f"\n--- {i+1}. {review['book_title']} ({stars}) ---\n"
+                stars = _STAR_STRINGS[max(0, min(5, int(review['rating'] or 0)))]
+                parts.append(f"\n--- {i+1}. {review['book_title']} ({stars}) ---\n")
                 
                 # Format date if available
                 date_str = f" on {review['date_added']}" if review['date_added'] else ""
-                details_text += f"Rated {review['rating']}/5{date_str}\n"
+                parts.append(f"Rated {review['rating']}/5{date_str}\n")
                 
                 # Include full review text
                 review_text = review['review_text']
                 if review_text and review_text != "[No text]":
-                    details_text += f"{review_text}\n"
+                    parts.append(f"{review_text}\n")
                 else:
-                    details_text += "[No review text]\n"
+                    parts.append("[No review text]\n")
                     
-            self.review_text.setText(details_text)
+            self.review_text.setText("".join(parts))
             
         except Exception as e:
             self.review_text.setText(f"Error fetching user details: {e}")
\ No newline at end of file
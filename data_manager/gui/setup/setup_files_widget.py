@@ -207,11 +207,10 @@ class SetupFilesWidget(QWidget):
             try:
                 from sqlite3 import connect
                 conn = connect(str(db_path))
-                cursor = conn.cursor()
                 # Check for at least one table
-                cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-                tables = cursor.fetchall()
-                is_initialized = len(tables) > 0
+                is_initialized = bool(conn.execute(
+                    "SELECT EXISTS(SELECT 1 FROM sqlite_master WHERE type='table' LIMIT 1)"
+                ).fetchone()[0])
                 conn.close()
             except Exception as e:
                 logger.error(f"Error checking database: {e}")